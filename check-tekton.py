@@ -1,74 +1,31 @@
 #!/usr/bin/env python3
-import json, subprocess, sys, time, os, re
+import sys, os
 
-def parse_lsp_responses(output):
-    """Parse LSP protocol responses (Content-Length + JSON)."""
-    messages = []
-    pattern = r'Content-Length: (\d+)\r\n\r\n'
-    
-    pos = 0
-    while pos < len(output):
-        match = re.search(pattern, output[pos:])
-        if not match:
-            break
-        
-        length = int(match.group(1))
-        json_start = pos + match.end()
-        json_end = json_start + length
-        
-        try:
-            msg = json.loads(output[json_start:json_end])
-            messages.append(msg)
-        except json.JSONDecodeError:
-            pass
-        
-        pos = json_end
-    
-    return messages
+from lsp_test_client import LSP_BINARY, initialize, send_lsp_message, start_server, wait_for
 
-def validate_tekton_file(filepath, lsp_binary="./target/release/tekton-lsp"):
+def validate_tekton_file(filepath, lsp_binary=LSP_BINARY):
     filepath = os.path.abspath(filepath)
     with open(filepath) as f:
         content = f.read()
 
-    proc = subprocess.Popen(
-        [lsp_binary],
-        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
+    proc = start_server(lsp_binary)
 
-    def send_msg(msg):
-        content_str = json.dumps(msg)
-        header = f"Content-Length: {len(content_str)}\r\n\r\n"
-        proc.stdin.write((header + content_str).encode())
-        proc.stdin.flush()
+    # Initialize handshake
+    initialize(proc, root_uri=f"file://{os.path.dirname(filepath)}")
 
-    # Initialize
-    send_msg({"jsonrpc":"2.0","id":1,"method":"initialize",
-              "params":{"capabilities":{},"processId":None,
-                       "rootUri":f"file://{os.path.dirname(filepath)}"}})
-    time.sleep(0.3)
-
-    # Initialized notification
-    send_msg({"jsonrpc":"2.0","method":"initialized","params":{}})
-    time.sleep(0.3)
-
-    # Send didOpen
-    send_msg({"jsonrpc":"2.0","method":"textDocument/didOpen",
-              "params":{"textDocument":{"uri":f"file://{filepath}",
-                                       "languageId":"yaml","version":1,"text":content}}})
-    time.sleep(1)
+    # Send didOpen and wait for the resulting diagnostics
+    send_lsp_message(proc, "textDocument/didOpen",
+                     {"textDocument": {"uri": f"file://{filepath}",
+                                       "languageId": "yaml", "version": 1,
+                                       "text": content}})
+    diag_msg = wait_for(proc, lambda msg: msg.get("method") == "textDocument/publishDiagnostics",
+                        timeout=10)
 
     proc.stdin.close()
-    output = proc.stdout.read().decode()
 
-    # Parse all LSP responses
-    messages = parse_lsp_responses(output)
-    
-    # Find publishDiagnostics message
-    for msg in messages:
-        if msg.get("method") == "textDocument/publishDiagnostics":
-            return msg.get("params", {}).get("diagnostics", [])
-    
+    if diag_msg:
+        return diag_msg.get("params", {}).get("diagnostics", [])
+
     return []
 
 if __name__ == "__main__":
@@ -0,0 +1,16 @@
+"""Pytest fixtures for the LSP test scripts."""
+import pytest
+
+from lsp_test_client import initialize, start_server, stop_server
+
+@pytest.fixture(scope="session")
+def lsp_server():
+    """One warm LSP server shared by every test in the session.
+
+    Server startup dominates each script's runtime, so paying it once per
+    session instead of once per feature keeps the suite I/O-bound.
+    """
+    proc = start_server()
+    initialize(proc)
+    yield proc
+    stop_server(proc)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Shared LSP client helpers for the test scripts.
+
+Speaks the stdio transport used by tekton-lsp: every message is a
+Content-Length header followed by a JSON-RPC payload. The helpers here
+are deliberately small — start a server, send a message, and block until
+the response (or notification) a script is waiting for arrives.
+"""
+import fcntl
+import itertools
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback when orjson is not installed
+    orjson = None
+
+# Resolved once at import, relative to the repo root rather than the
+# caller's cwd, so every script finds the same binary and a missing build
+# fails immediately with a hint instead of a bare FileNotFoundError from
+# Popen on every launch.
+LSP_BINARY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "target", "release", "tekton-lsp")
+if not os.path.exists(LSP_BINARY):
+    raise FileNotFoundError(
+        f"{LSP_BINARY} not found — build it with `cargo build --release`")
+
+# Caps so a chatty or misbehaving server cannot grow memory without
+# bound: frames larger than MAX_MESSAGE_BYTES are skipped, and a full
+# message queue applies backpressure through the pipe instead of
+# buffering forever.
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+MAX_PENDING_MESSAGES = 1024
+
+# Requested kernel pipe capacity for the server's stdio (Linux only).
+PIPE_CAPACITY_BYTES = 1 << 20
+
+def dumps(obj):
+    """Serialize an LSP message to UTF-8 bytes (orjson when available).
+
+    bytes input is passed through untouched, so a caller holding an
+    already-serialized body never pays for a second encode.
+    """
+    if isinstance(obj, bytes):
+        return obj
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+def loads(data):
+    """Deserialize an LSP message from bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _drain_messages(stdout, messages):
+    """Reader-thread loop: decode frames as they arrive; None marks EOF."""
+    while True:
+        msg = read_message(stdout)
+        messages.put(msg)
+        if msg is None:
+            break
+
+def start_server(lsp_binary=LSP_BINARY):
+    """Start the LSP server with pipes attached to stdin/stdout/stderr.
+
+    A daemon thread drains stdout into proc.lsp_messages as frames
+    arrive, so the server can never block on a full stdout pipe while a
+    script is still writing to stdin.
+    """
+    # bufsize=0 gives raw unbuffered pipes: writes reach the server as
+    # soon as they are issued and reads never sit in a Python-side buffer.
+    # stderr goes to DEVNULL — nobody reads it, and a PIPE left undrained
+    # would eventually block a server that logs enough there.
+    proc = subprocess.Popen([lsp_binary], stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, bufsize=0)
+    # Pre-size the kernel pipes (best effort) so a burst of diagnostics
+    # or one large didOpen fits without anyone blocking on the 64 KiB
+    # default capacity.
+    if hasattr(fcntl, "F_SETPIPE_SZ"):
+        for pipe in (proc.stdin, proc.stdout):
+            try:
+                fcntl.fcntl(pipe.fileno(), fcntl.F_SETPIPE_SZ,
+                            PIPE_CAPACITY_BYTES)
+            except OSError:
+                pass  # over fs.pipe-max-size; the default still works
+    proc.lsp_messages = queue.Queue(MAX_PENDING_MESSAGES)
+    proc.lsp_ids = itertools.count(1)
+    threading.Thread(target=_drain_messages,
+                     args=(proc.stdout, proc.lsp_messages),
+                     daemon=True).start()
+    return proc
+
+def request(proc, method, params=None, messages=None):
+    """Send a request with the next free id and wait for its response.
+
+    Ids come from a per-server counter so several scripts can share one
+    server without colliding.
+    """
+    msg_id = next(proc.lsp_ids)
+    send_lsp_message(proc, method, params, msg_id=msg_id)
+    return wait_for(proc, lambda msg: msg.get("id") == msg_id, messages)
+
+def initialize(proc, root_uri="file:///tmp/tekton-test", messages=None):
+    """Run the initialize/initialized startup handshake."""
+    request(proc, "initialize",
+            {"capabilities": {}, "processId": None, "rootUri": root_uri},
+            messages)
+    send_lsp_message(proc, "initialized", {})
+
+def _frame(method, params=None, msg_id=None):
+    """Build one framed JSON-RPC message as a (header, body) buffer pair."""
+    message = {"jsonrpc": "2.0", "method": method}
+    if params is not None:
+        message["params"] = params
+    if msg_id is not None:
+        message["id"] = msg_id
+
+    body = dumps(message)
+    header = b"Content-Length: %d\r\n\r\n" % len(body)
+    return header, body
+
+def _writev(stdin, buffers):
+    """Gather-write buffers to the pipe in one syscall, handling short writes."""
+    fd = stdin.fileno()
+    written = os.writev(fd, buffers)
+    remainder = sum(len(b) for b in buffers) - written
+    if remainder:
+        rest = memoryview(b"".join(buffers))[-remainder:]
+        while rest:
+            rest = rest[os.write(fd, rest):]
+
+def send_lsp_message(proc, method, params=None, msg_id=None):
+    """Send one framed JSON-RPC message (a request when msg_id is set)."""
+    _writev(proc.stdin, _frame(method, params, msg_id))
+
+def notify_all(proc, notifications):
+    """Send several (method, params) notifications in a single write.
+
+    Consecutive notifications such as back-to-back didOpens don't need a
+    response in between, so batching them saves the per-message syscalls
+    on the unbuffered pipe."""
+    buffers = []
+    for method, params in notifications:
+        buffers.extend(_frame(method, params))
+    _writev(proc.stdin, buffers)
+
+def _read_header(stdout):
+    """Parse one header block; returns the Content-Length or None on EOF/garbage."""
+    length = None
+    while True:
+        line = stdout.readline()
+        if not line:
+            return None
+        if line == b"\r\n":
+            return length
+        name, sep, value = line.partition(b":")
+        if sep and name.lower() == b"content-length":
+            value = value.strip()
+            # bytes.isdigit() accepts ASCII digits only, matching the LSP
+            # grammar; int() alone would also take "+1", "1_0", etc.
+            if not value.isdigit():
+                return None
+            length = int(value)
+
+def _read_exact(stdout, length):
+    """Read exactly length bytes; raw pipes are allowed to return short reads."""
+    chunks = []
+    while length:
+        chunk = stdout.read(length)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        length -= len(chunk)
+    return b"".join(chunks)
+
+def _discard(stdout, length):
+    """Skip an oversized body without ever buffering the whole thing."""
+    while length:
+        chunk = stdout.read(min(length, 65536))
+        if not chunk:
+            return
+        length -= len(chunk)
+
+def read_message(stdout):
+    """Read a single Content-Length framed LSP message from the server."""
+    while True:
+        length = _read_header(stdout)
+        if length is None:
+            return None
+        if length > MAX_MESSAGE_BYTES:
+            _discard(stdout, length)
+            continue
+        body = _read_exact(stdout, length)
+        if body is None:
+            return None
+        return loads(body)
+
+def stop_server(proc, messages=None):
+    """Run the LSP shutdown/exit handshake and reap the server process.
+
+    Waits for the shutdown response, sends exit, then waits for the
+    reader thread to observe EOF — at that point the server has closed
+    stdout on its way out and wait() returns immediately, with no need
+    for a guessed timeout.
+    """
+    request(proc, "shutdown", {}, messages)
+    send_lsp_message(proc, "exit", {})
+    proc.stdin.close()
+    wait_for(proc, lambda msg: False)  # drain until EOF
+    proc.wait()
+
+def wait_for(proc, pred, messages=None, timeout=None):
+    """Take server messages until pred(msg) is true; returns the match.
+
+    Returns None on EOF, or when timeout seconds pass without a match.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        if deadline is None:
+            msg = proc.lsp_messages.get()
+        else:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                msg = proc.lsp_messages.get(timeout=remaining)
+            except queue.Empty:
+                return None
+        if msg is None:
+            return None
+        if messages is not None:
+            messages.append(msg)
+        if pred(msg):
+            return msg
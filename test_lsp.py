@@ -0,0 +1,31 @@
+"""Run the LSP feature scripts under pytest against one shared server.
+
+The feature scripts keep their hyphenated names and remain runnable on
+their own (each starts its own server under __main__), so they are
+loaded here by path and driven through the session-scoped lsp_server
+fixture instead.
+"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+_HERE = Path(__file__).parent
+
+def _load_script(filename):
+    name = filename.replace("-", "_").removesuffix(".py")
+    spec = importlib.util.spec_from_file_location(name, _HERE / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.mark.parametrize("script", [
+    "test-completion.py",
+    "test-hover.py",
+    "test-definition.py",
+    "test-symbols.py",
+    "test-formatting.py",
+    "test-codeactions.py",
+])
+def test_feature(script, lsp_server):
+    assert _load_script(script).run(lsp_server, []), f"{script} failed"